@@ -0,0 +1,95 @@
+"""
+Response Cache
+
+Read-through Redis cache for read-mostly endpoints. Cached entries hold the
+already-encoded JSON body, so a hit is returned without touching MongoDB or
+the serializer. Caching is skipped entirely when REDIS_URL is not set.
+
+The Redis server is expected to run with `maxmemory-policy allkeys-lru` so
+the cache can never grow without bound.
+"""
+
+import asyncio
+import functools
+import os
+from dotenv import load_dotenv
+from fastapi import Response
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+# Load environment variables from .env file
+load_dotenv()
+
+_redis = None
+
+redis_url = os.getenv("REDIS_URL")
+
+# A slow or unreachable Redis must not hold up requests; give up quickly and
+# serve from MongoDB instead
+_SOCKET_TIMEOUT = 0.2
+_HEALTH_CHECK_INTERVAL = 30
+
+# Errors treated as a cache miss (or a skipped write) rather than a failure
+_CACHE_ERRORS = (RedisError, asyncio.TimeoutError)
+
+def connect_cache():
+    """Create the Redis client for this process, if REDIS_URL is configured"""
+    global _redis
+    if redis_url and _redis is None:
+        _redis = aioredis.from_url(
+            redis_url,
+            socket_connect_timeout=_SOCKET_TIMEOUT,
+            socket_timeout=_SOCKET_TIMEOUT,
+            health_check_interval=_HEALTH_CHECK_INTERVAL,
+        )
+    return _redis
+
+async def close_cache():
+    """Close the Redis client opened by connect_cache"""
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+    _redis = None
+
+def _cache_key(key: str, params: dict) -> str:
+    if not params:
+        return key
+    return key + ":" + ":".join(f"{name}={params[name]}" for name in sorted(params))
+
+def cached(key: str, ttl: int = 300):
+    """Cache the JSON body of an endpoint under `key` plus its query arguments"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _redis is None:
+                return await func(*args, **kwargs)
+
+            cache_key = _cache_key(key, kwargs)
+            try:
+                body = await _redis.get(cache_key)
+            except _CACHE_ERRORS:
+                body = None
+            if body is not None:
+                return Response(content=body, media_type="application/json")
+
+            response = await func(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                try:
+                    await _redis.set(cache_key, response.body, ex=ttl)
+                except _CACHE_ERRORS:
+                    pass
+            return response
+        return wrapper
+    return decorator
+
+async def invalidate(*keys: str):
+    """Drop the cached entries for each key, across all of their query arguments"""
+    if _redis is None:
+        return
+    try:
+        names = list(keys)
+        for key in keys:
+            names.extend([name async for name in _redis.scan_iter(match=f"{key}:*")])
+        await _redis.delete(*names)
+    except _CACHE_ERRORS:
+        pass
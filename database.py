@@ -5,28 +5,98 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
 from datetime import datetime, timezone
+import logging
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 _client = None
 db = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+# Each uvicorn worker opens its own client, so the default budget of 200 max /
+# 20 idle connections is split across WEB_CONCURRENCY workers. The
+# DATABASE_*_POOL_SIZE overrides are per worker.
+_workers = max(int(os.getenv("WEB_CONCURRENCY", 1)), 1)
+max_pool_size = int(os.getenv("DATABASE_MAX_POOL_SIZE", max(200 // _workers, 10)))
+min_pool_size = int(os.getenv("DATABASE_MIN_POOL_SIZE", max(20 // _workers, 1)))
+
+def connect_db():
+    """Create the Motor client for this process and return the database handle"""
+    global _client, db
+    if database_url and database_name and _client is None:
+        _client = AsyncIOMotorClient(
+            database_url,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            compressors="zstd,zlib",
+            zlibCompressionLevel=-1,
+            retryWrites=True,
+            # fail fast when MongoDB is unreachable instead of waiting 30 s
+            serverSelectionTimeoutMS=2000,
+        )
+        db = _client[database_name]
+    return db
+
+def close_db():
+    """Close the Motor client opened by connect_db"""
+    global _client, db
+    if _client is not None:
+        _client.close()
+    _client = None
+    db = None
+
+# (collection, keys, options) for the indexes the API queries rely on
+_INDEXES = [
+    ("question", "mode", {}),
+    # multikey index so tag lookups do not scan the collection
+    ("question", "tags", {}),
+    # serves both mode filters and newest-first listing of answers
+    ("answer", [("mode", 1), ("_id", -1)], {}),
+    ("blogpost", "slug", {"unique": True}),
+    # partial rather than sparse: chat messages store mode: null when it is
+    # absent, and a sparse index would still cover those
+    ("chatmessage", "mode", {"partialFilterExpression": {"mode": {"$type": "string"}}}),
+]
+
+async def ensure_indexes():
+    """Create the indexes the API queries rely on (no-op if they already exist)"""
+    if db is None:
+        return
+    for collection_name, keys, options in _INDEXES:
+        try:
+            await db[collection_name].create_index(keys, **options)
+        except ConnectionFailure as e:
+            # MongoDB is unreachable; every remaining build would wait out the
+            # same server selection timeout, so give up on all of them
+            logger.warning("Could not create MongoDB indexes: %s", e)
+            return
+        except PyMongoError as e:
+            # index-specific failure (e.g. duplicate keys); carry on with the rest
+            logger.warning("Could not create index %s on %s: %s", keys, collection_name, e)
+
+class PartialInsertError(Exception):
+    """Some documents of an unordered batch insert failed while the rest were written"""
+
+    def __init__(self, inserted_ids: List[str], errors: List[dict]):
+        super().__init__(f"{len(errors)} of {len(inserted_ids) + len(errors)} documents failed to insert")
+        self.inserted_ids = inserted_ids
+        # pymongo write errors, each with the failed document's batch "index" and "code"
+        self.errors = errors
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +110,61 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert several documents with timestamps in a single unordered batch
+
+    Raises PartialInsertError when some documents fail; the others have still
+    been inserted and their ids are on the exception.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    if not items:
+        return []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for item in items:
+        data_dict = item.model_dump() if isinstance(item, BaseModel) else item.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    # unordered so one failing document does not abort the rest of the batch
+    try:
+        result = await db[collection_name].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not errors:
+            raise
+        # insert_many assigns each document its _id before sending the batch
+        failed = {err["index"] for err in errors}
+        inserted_ids = [str(d["_id"]) for i, d in enumerate(docs) if i not in failed]
+        raise PartialInsertError(inserted_ids, errors) from e
+    return [str(_id) for _id in result.inserted_ids]
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get documents from collection, optionally restricted to the projected fields"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=limit)
+
+def find_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, sort: list = None):
+    """Get a cursor over documents from collection, for streaming large results"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
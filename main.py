@@ -1,159 +1,253 @@
 import os
-from fastapi import FastAPI, HTTPException
+import time
+import orjson
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-from database import create_document, get_documents, db
-from schemas import Mode, Question, Answer, BlogPost, ContactMessage, ChatMessage, PricingPlan
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from pymongo.errors import DuplicateKeyError
+from typing import List, Optional, Union
+from database import PartialInsertError, create_document, create_documents, get_documents, find_documents, connect_db, close_db, ensure_indexes
+from cache import cached, invalidate, connect_cache, close_cache
+from schemas import ModeKey, Mode, Question, Answer, BlogPost, ContactMessage, ChatMessage, PricingPlan
 
-app = FastAPI(title="IMAGINE API", description="Creative world-building card game for Kenya")
+# Default content served before the database is seeded, built and encoded once
+_DEFAULT_MODES = (
+    Mode(key="child", title="Child", description="Playful prompts for kids to imagine better worlds.", color="#FDBA74"),
+    Mode(key="arts", title="Arts & Culture", description="Explore culture, identity and expression.", color="#FDE68A"),
+    Mode(key="creative", title="Creative", description="Open-ended ideation and storytelling.", color="#86EFAC"),
+    Mode(key="technology", title="Technology", description="Invent systems and tools for the future.", color="#93C5FD"),
+)
+_DEFAULT_PRICING = (
+    PricingPlan(name="Starter", price_month=0, price_year=0, features=["Community play", "Basic prompts", "Public chat"]),
+    PricingPlan(name="Creator", price_month=4.99, price_year=49.0, features=["All modes", "Saved worlds", "Custom decks"]),
+    PricingPlan(name="Team", price_month=14.99, price_year=149.0, features=["Facilitator tools", "Scoreboards", "Workshop mode"]),
+)
+_ROOT_JSON = orjson.dumps({"message": "IMAGINE API running"})
+_DEFAULT_MODES_JSON = orjson.dumps([m.model_dump() for m in _DEFAULT_MODES])
+_DEFAULT_PRICING_JSON = orjson.dumps([p.model_dump() for p in _DEFAULT_PRICING])
+
+# Mongo projections matching each response model, so documents come back
+# already shaped like the model and can be serialized as-is
+_QUESTION_PROJECTION = {**{f: 1 for f in Question.model_fields}, "_id": 0}
+_MODE_PROJECTION = {**{f: 1 for f in Mode.model_fields}, "_id": 0}
+_PRICING_PROJECTION = {**{f: 1 for f in PricingPlan.model_fields}, "_id": 0}
+_BLOG_PROJECTION = {**{f: 1 for f in BlogPost.model_fields}, "_id": 0}
+# streamed feeds keep their id and creation time for clients to key and order on
+_ANSWER_PROJECTION = {**{f: 1 for f in Answer.model_fields}, "created_at": 1}
+_CHAT_PROJECTION = {**{f: 1 for f in ChatMessage.model_fields}, "created_at": 1}
+
+# Documents fetched before a streamed response starts; see _stream_json_array
+_STREAM_FIRST_BATCH = 100
+
+def _encode_doc(doc: dict) -> bytes:
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return orjson.dumps(doc)
+
+async def _json_array(first: List[dict], cursor):
+    """Encode documents as a JSON array: the prefetched batch, then the rest of the cursor"""
+    yield b"[" + b",".join(_encode_doc(doc) for doc in first)
+    sep = b"," if first else b""
+    async for doc in cursor:
+        yield sep + _encode_doc(doc)
+        sep = b","
+    yield b"]"
+
+async def _stream_json_array(cursor) -> StreamingResponse:
+    # The 200 and headers go out once streaming starts, so run the query and
+    # fetch the first batch now; connection errors still surface as a 500
+    first = await cursor.to_list(length=_STREAM_FIRST_BATCH)
+    return StreamingResponse(_json_array(first, cursor), media_type="application/json")
+
+app = FastAPI(
+    title="IMAGINE API",
+    description="Creative world-building card game for Kenya",
+    default_response_class=ORJSONResponse,
+)
+
+# Comma-separated list of allowed origins, e.g. "https://imagine.co.ke,https://www.imagine.co.ke"
+_CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=_CORS_ORIGINS,
+    allow_credentials=False,
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
 )
 
+# Compress the larger JSON list responses; small bodies are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+@app.on_event("startup")
+async def open_database():
+    # One Motor client per worker process, shared by every request
+    app.state.db = connect_db()
+    connect_cache()
+    # failures are logged per index; /test reports the database state
+    await ensure_indexes()
+
+@app.on_event("shutdown")
+async def close_database():
+    close_db()
+    app.state.db = None
+    await close_cache()
+
 @app.get("/")
-def read_root():
-    return {"message": "IMAGINE API running"}
+async def read_root():
+    return Response(content=_ROOT_JSON, media_type="application/json")
 
 # Utility to seed default content (modes, pricing)
 @app.post("/seed")
-def seed_content():
+async def seed_content():
+    db = app.state.db
     if db is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
-    existing = db["mode"].count_documents({})
-    if existing == 0:
-        default_modes = [
-            Mode(key="child", title="Child", description="Playful prompts for kids to imagine better worlds.", color="#FDBA74"),
-            Mode(key="arts", title="Arts & Culture", description="Explore culture, identity and expression.", color="#FDE68A"),
-            Mode(key="creative", title="Creative", description="Open-ended ideation and storytelling.", color="#86EFAC"),
-            Mode(key="technology", title="Technology", description="Invent systems and tools for the future.", color="#93C5FD"),
-        ]
-        for m in default_modes:
-            create_document("mode", m)
-
-    existing_pricing = db["pricingplan"].count_documents({})
-    if existing_pricing == 0:
-        plans = [
-            PricingPlan(name="Starter", price_month=0, price_year=0, features=["Community play", "Basic prompts", "Public chat"]),
-            PricingPlan(name="Creator", price_month=4.99, price_year=49.0, features=["All modes", "Saved worlds", "Custom decks"]),
-            PricingPlan(name="Team", price_month=14.99, price_year=149.0, features=["Facilitator tools", "Scoreboards", "Workshop mode"]),
-        ]
-        for p in plans:
-            create_document("pricingplan", p)
+    # a single-document lookup is enough to know whether a collection is empty
+    if await db["mode"].find_one({}, projection={"_id": 1}) is None:
+        await create_documents("mode", list(_DEFAULT_MODES))
 
+    if await db["pricingplan"].find_one({}, projection={"_id": 1}) is None:
+        await create_documents("pricingplan", list(_DEFAULT_PRICING))
+
+    await invalidate("modes", "pricing")
     return {"status": "seeded"}
 
 # Questions
-@app.get("/questions", response_model=List[Question])
-def list_questions(mode: Optional[str] = None, limit: int = 50):
+@app.get("/questions", response_model=None)
+@cached("questions")
+async def list_questions(mode: Optional[ModeKey] = None, limit: int = Query(50, ge=1)):
     filt = {"mode": mode} if mode else {}
-    docs = get_documents("question", filt, limit)
-    return [Question(**{k: v for k, v in d.items() if k in Question.model_fields}) for d in docs]
+    docs = await get_documents("question", filt, limit, _QUESTION_PROJECTION)
+    return ORJSONResponse(docs)
 
 class NewQuestion(BaseModel):
-    mode: str
+    mode: ModeKey
     text: str
-    tags: Optional[List[str]] = None
+    tags: List[str] = Field(default_factory=list)
     locale: str = "en-KE"
 
 @app.post("/questions")
-def create_question(payload: NewQuestion):
-    if payload.mode not in ["child", "arts", "creative", "technology"]:
-        raise HTTPException(status_code=400, detail="Invalid mode")
-    created_id = create_document("question", payload.dict())
+async def create_question(payload: Union[NewQuestion, List[NewQuestion]]):
+    if isinstance(payload, list):
+        created_ids = await create_documents("question", payload)
+        await invalidate("questions")
+        return {"ids": created_ids}
+    created_id = await create_document("question", payload)
+    await invalidate("questions")
     return {"id": created_id}
 
 # Answers
 @app.post("/answers")
-def submit_answer(ans: Answer):
-    created_id = create_document("answer", ans)
+async def submit_answer(ans: Answer):
+    created_id = await create_document("answer", ans)
     return {"id": created_id}
 
 @app.get("/answers")
-def list_answers(mode: Optional[str] = None, limit: int = 50):
+async def list_answers(mode: Optional[str] = None, limit: int = Query(50, ge=1)):
     filt = {"mode": mode} if mode else {}
-    docs = get_documents("answer", filt, limit)
-    return docs
+    cursor = find_documents("answer", filt, limit, _ANSWER_PROJECTION, sort=[("_id", -1)])
+    return await _stream_json_array(cursor)
 
 # Modes
-@app.get("/modes", response_model=List[Mode])
-def get_modes():
-    docs = get_documents("mode", {}, 10)
+@app.get("/modes", response_model=None)
+@cached("modes")
+async def get_modes():
+    docs = await get_documents("mode", {}, 10, _MODE_PROJECTION)
     if not docs:
         # provide defaults without DB write if not seeded
-        return [
-            Mode(key="child", title="Child", description="Playful prompts for kids to imagine better worlds.", color="#FDBA74"),
-            Mode(key="arts", title="Arts & Culture", description="Explore culture, identity and expression.", color="#FDE68A"),
-            Mode(key="creative", title="Creative", description="Open-ended ideation and storytelling.", color="#86EFAC"),
-            Mode(key="technology", title="Technology", description="Invent systems and tools for the future.", color="#93C5FD"),
-        ]
-    return [Mode(**{k: v for k, v in d.items() if k in Mode.model_fields}) for d in docs]
+        return Response(content=_DEFAULT_MODES_JSON, media_type="application/json")
+    return ORJSONResponse(docs)
 
 # Pricing
-@app.get("/pricing", response_model=List[PricingPlan])
-def get_pricing():
-    docs = get_documents("pricingplan", {}, 10)
+@app.get("/pricing", response_model=None)
+@cached("pricing")
+async def get_pricing():
+    docs = await get_documents("pricingplan", {}, 10, _PRICING_PROJECTION)
     if not docs:
-        return [
-            PricingPlan(name="Starter", price_month=0, price_year=0, features=["Community play", "Basic prompts", "Public chat"]),
-            PricingPlan(name="Creator", price_month=4.99, price_year=49.0, features=["All modes", "Saved worlds", "Custom decks"]),
-            PricingPlan(name="Team", price_month=14.99, price_year=149.0, features=["Facilitator tools", "Scoreboards", "Workshop mode"]),
-        ]
-    return [PricingPlan(**{k: v for k, v in d.items() if k in PricingPlan.model_fields}) for d in docs]
+        return Response(content=_DEFAULT_PRICING_JSON, media_type="application/json")
+    return ORJSONResponse(docs)
 
 # Blog
-@app.get("/blog", response_model=List[BlogPost])
-def list_blog():
-    docs = get_documents("blogpost", {}, 20)
-    return [BlogPost(**{k: v for k, v in d.items() if k in BlogPost.model_fields}) for d in docs]
+@app.get("/blog", response_model=None)
+@cached("blog")
+async def list_blog():
+    docs = await get_documents("blogpost", {}, 20, _BLOG_PROJECTION)
+    return ORJSONResponse(docs)
 
 @app.post("/blog")
-def create_blog(post: BlogPost):
-    created_id = create_document("blogpost", post)
+async def create_blog(post: Union[BlogPost, List[BlogPost]]):
+    if isinstance(post, list):
+        try:
+            created_ids = await create_documents("blogpost", post)
+        except PartialInsertError as e:
+            # the batch is unordered, so every post without an error was written
+            await invalidate("blog")
+            if any(err["code"] != 11000 for err in e.errors):
+                raise
+            errors = [{"index": err["index"], "detail": "A post with this slug already exists"} for err in e.errors]
+            return ORJSONResponse({"ids": e.inserted_ids, "errors": errors}, status_code=207)
+        await invalidate("blog")
+        return {"ids": created_ids}
+    try:
+        created_id = await create_document("blogpost", post)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A post with this slug already exists")
+    await invalidate("blog")
     return {"id": created_id}
 
 # Contact form
 @app.post("/contact")
-def contact(message: ContactMessage):
-    created_id = create_document("contactmessage", message)
+async def contact(message: ContactMessage):
+    created_id = await create_document("contactmessage", message)
     return {"id": created_id, "status": "received"}
 
 # Chat (simple public stream)
 @app.post("/chat")
-def send_chat(msg: ChatMessage):
-    created_id = create_document("chatmessage", msg)
+async def send_chat(msg: ChatMessage):
+    created_id = await create_document("chatmessage", msg)
     return {"id": created_id}
 
 @app.get("/chat")
-def get_chat(limit: int = 30):
-    docs = get_documents("chatmessage", {}, limit)
-    return docs
+async def get_chat(limit: int = Query(30, ge=1)):
+    cursor = find_documents("chatmessage", {}, limit, _CHAT_PROJECTION, sort=[("_id", -1)])
+    return await _stream_json_array(cursor)
+
+# /test is polled by health checks, so the environment is read once and the
+# collection listing is reused for a short while
+_DB_URL_STATUS = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
+_DB_NAME_STATUS = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+_COLLECTIONS_TTL = 30
+_collections_cache = None
+
+async def _list_collections(db) -> List[str]:
+    global _collections_cache
+    now = time.monotonic()
+    if _collections_cache is None or now - _collections_cache[0] >= _COLLECTIONS_TTL:
+        collections = await db.list_collection_names()
+        _collections_cache = (now, collections[:10])
+    return _collections_cache[1]
 
 @app.get("/test")
-def test_database():
+async def test_database():
+    db = app.state.db
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
+        "database_url": _DB_URL_STATUS,
+        "database_name": _DB_NAME_STATUS,
         "connection_status": "Not Connected",
         "collections": []
     }
     try:
         if db is not None:
             response["database"] = "✅ Available"
-            response["database_url"] = "✅ Configured"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
-                response["collections"] = collections[:10]
+                response["collections"] = await _list_collections(db)
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -161,12 +255,17 @@ def test_database():
             response["database"] = "⚠️  Available but not initialized"
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
-    import os as _os
-    response["database_url"] = "✅ Set" if _os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if _os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # each worker opens its own Motor client and Redis connection in the startup hook;
+    # exporting the worker count lets database.py split its pool budget between them
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 2))
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    # keep idle client connections open longer than a typical 60 s load-balancer
+    # idle timeout, so the proxy never reuses a socket uvicorn just closed
+    keep_alive = int(os.getenv("KEEP_ALIVE_TIMEOUT", 75))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="uvloop", http="httptools",
+                workers=workers, timeout_keep_alive=keep_alive)
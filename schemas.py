@@ -4,9 +4,12 @@ Database Schemas for IMAGINE game
 Each Pydantic model represents a collection in MongoDB. Collection name is the lowercase of the class name.
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
+# Keys of the game modes, validated by pydantic-core wherever a mode is accepted
+ModeKey = Literal["child", "arts", "creative", "technology"]
+
 class Mode(BaseModel):
     key: str = Field(..., description="Unique key for the mode: child, arts, creative, technology")
     title: str = Field(..., description="Display title for the mode")
@@ -14,13 +17,13 @@ class Mode(BaseModel):
     color: str = Field(..., description="Primary color for the mode UI")
 
 class Question(BaseModel):
-    mode: str = Field(..., description="Mode key this question belongs to")
+    mode: ModeKey = Field(..., description="Mode key this question belongs to")
     text: str = Field(..., description="The creative prompt/question text")
-    tags: Optional[List[str]] = Field(default=None, description="Related tags")
+    tags: List[str] = Field(default_factory=list, description="Related tags")
     locale: str = Field("en-KE", description="Locale of the prompt")
 
 class Answer(BaseModel):
-    mode: str = Field(..., description="Mode key")
+    mode: ModeKey = Field(..., description="Mode key")
     question_text: str = Field(..., description="The question being answered")
     answer_text: str = Field(..., description="User's answer/idea")
     username: Optional[str] = Field(default=None, description="Optional player name")
@@ -44,7 +47,7 @@ class ContactMessage(BaseModel):
 class ChatMessage(BaseModel):
     username: str
     text: str
-    mode: Optional[str] = Field(default=None, description="Optional mode context for the chat message")
+    mode: Optional[ModeKey] = Field(default=None, description="Optional mode context for the chat message")
 
 class PricingPlan(BaseModel):
     name: str